@@ -2,7 +2,7 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import io
-import time
+import functools
 
 # --- PAGE CONFIG ---
 st.set_page_config(page_title="Automated Data Cleaning Pipeline", page_icon="🤖", layout="wide")
@@ -14,6 +14,7 @@ st.markdown("""
 """)
 
 # --- 1. HELPER: GENERATE MESSY DATA ---
+@st.cache_data
 def generate_messy_data():
     np.random.seed(42)
     rows = 50
@@ -32,53 +33,95 @@ def generate_messy_data():
     df = pd.concat([df, df.iloc[:5]], ignore_index=True) # Duplicate first 5 rows
     return df
 
-# --- 2. THE AUTOMATION LOGIC ---
-def clean_data(df):
+# Date formats produced by the demo data (month-first, as previously inferred)
+DATE_FORMATS = ['%Y-%m-%d', '%m/%d/%Y', '%b %d, %Y', '%Y/%m/%d']
+
+# Natural-key columns to dedupe on (checked after header normalization)
+ID_COLUMNS = ['transaction_id', 'order_id', 'id']
+
+# --- 2. THE AUTOMATION LOGIC (Cached so unchanged input is not re-cleaned) ---
+# `_df` is not hashed (Streamlit samples large frames, so edits could hit a stale entry);
+# the cache is keyed on `source_key`, which must identify the exact input (e.g. raw upload bytes).
+@st.cache_data(max_entries=8) # Bounded: keys are user uploads
+def clean_data(_df, source_key):
     report_log = []
     
     # A. Standardize Column Names
-    df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
+    df = _df.rename(columns=lambda c: c.strip().lower().replace(' ', '_'))
     report_log.append("✅ Standardized column headers (lowercase, no spaces).")
     
     # B. Remove Duplicates
     initial_count = len(df)
-    df = df.drop_duplicates()
-    removed_count = initial_count - len(df)
-    report_log.append(f"✅ Removed {removed_count} duplicate rows.")
+    id_col = next((c for c in ID_COLUMNS if c in df.columns), None)
+    if id_col:
+        # Hash only the key; rows with a blank key are never treated as duplicates
+        dup = df.duplicated(subset=[id_col]) & df[id_col].notna()
+        df = df[~dup]
+        removed_count = initial_count - len(df)
+        report_log.append(f"✅ Removed {removed_count} duplicate rows (repeated '{id_col}' values).")
+    else:
+        df = df.drop_duplicates()
+        removed_count = initial_count - len(df)
+        report_log.append(f"✅ Removed {removed_count} duplicate rows.")
     
     # C. Fix 'Amount' Column (Remove commas, convert to float)
     if 'amount' in df.columns:
-        df['amount'] = df['amount'].astype(str).str.replace(',', '', regex=True)
-        df['amount'] = pd.to_numeric(df['amount'], errors='coerce')
-        df['amount'].fillna(0, inplace=True) # Fill missing money with 0
+        # Literal comma strip (no regex) + numeric coercion in one pass; missing money -> 0
+        df = df.assign(amount=lambda d: pd.to_numeric(
+            d['amount'].astype('string').str.replace(',', '', regex=False), errors='coerce'
+        ).fillna(0.0).astype('float64')) # Nullable Int64/Float64 back to plain float
         report_log.append("✅ Cleaned 'Amount' column (removed commas, converted text to numbers).")
 
     # D. Fix 'Status' Column (Capitalize consistently)
     if 'status' in df.columns:
-        df['status'] = df['status'].str.title()
+        # Title-case once per distinct value instead of once per row
+        status = df['status'].astype('string').str.strip().str.lower().astype('category')
+        df = df.assign(status=status.cat.rename_categories({c: c.title() for c in status.cat.categories}))
         report_log.append("✅ Standardized 'Status' column casing.")
         
     # E. Fix Date Column
     if 'date' in df.columns:
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
-        df = df.dropna(subset=['date']) # Drop rows where date is completely broken
+        # One fast fixed-format pass per known format, coalesced together
+        parsed = functools.reduce(
+            lambda a, b: a.combine_first(b),
+            (pd.to_datetime(df['date'], format=fmt, errors='coerce') for fmt in DATE_FORMATS)
+        )
+        leftover = parsed.isna() & df['date'].notna()
+        if leftover.any():
+            # Unknown formats (e.g. uploaded files, tz-aware ISO): re-parse the whole column with
+            # per-value inference so pandas picks one dtype, instead of writing mixed dtypes into `parsed`
+            parsed = pd.to_datetime(df['date'], format='mixed', errors='coerce')
+        df = df.assign(date=parsed).dropna(subset=['date']) # Drop rows where date is completely broken
         report_log.append("✅ Parsed mixed Date formats into ISO standard (YYYY-MM-DD).")
         
     return df, report_log
 
+# --- EXPORT (Only runs when the user clicks Download) ---
+def to_csv_bytes(df):
+    buf = io.BytesIO() # Write encoded bytes in chunks instead of one giant str
+    df.to_csv(buf, index=False, encoding='utf-8', chunksize=10_000)
+    return buf.getvalue()
+
 # --- 3. UI LAYOUT ---
 
+def reset_results():
+    # New input invalidates the previous run's results
+    st.session_state.pop('df_clean', None)
+    st.session_state.pop('logs', None)
+
 # Sidebar
 st.sidebar.header("1. Upload / Generate")
-data_source = st.sidebar.radio("Choose Data Source:", ["Use Messy Demo Data", "Upload CSV File"])
+data_source = st.sidebar.radio("Choose Data Source:", ["Use Messy Demo Data", "Upload CSV File"], on_change=reset_results)
 
 if data_source == "Use Messy Demo Data":
     df_raw = generate_messy_data()
+    source_key = "demo"
     st.sidebar.info("Generated a sample dataset with intentional errors (duplicates, bad dates, text in number fields).")
 else:
-    uploaded_file = st.sidebar.file_uploader("Upload your messy CSV", type=["csv"])
+    uploaded_file = st.sidebar.file_uploader("Upload your messy CSV", type=["csv"], on_change=reset_results)
     if uploaded_file:
         df_raw = pd.read_csv(uploaded_file)
+        source_key = uploaded_file.getvalue() # Exact upload content keys the cleaning cache
     else:
         st.stop()
 
@@ -94,11 +137,16 @@ with col1:
 if st.button("🚀 Run Automation Pipeline", type="primary"):
     
     with st.spinner("Running cleaning algorithms..."):
-        time.sleep(1.5) # Simulate processing time for effect
-        df_clean, logs = clean_data(df_raw.copy())
+        df_clean, logs = clean_data(df_raw, source_key)
+        st.session_state['df_clean'] = df_clean
+        st.session_state['logs'] = logs
     
-    # Success Area
     st.balloons()
+
+# Success Area (rendered from session state so it survives the rerun triggered by Download)
+if 'df_clean' in st.session_state:
+    df_clean = st.session_state['df_clean']
+    logs = st.session_state['logs']
     
     with col2:
         st.subheader("✅ Cleaned / Standardized Data")
@@ -133,10 +181,9 @@ if st.button("🚀 Run Automation Pipeline", type="primary"):
         """)
         
     # Download Button
-    csv = df_clean.to_csv(index=False).encode('utf-8')
     st.download_button(
         label="📥 Download Cleaned CSV",
-        data=csv,
+        data=functools.partial(to_csv_bytes, df_clean), # Deferred: serialized on click
         file_name='clean_data_export.csv',
         mime='text/csv',
 
@@ -3,7 +3,6 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-import datetime
 
 # --- 1. PAGE CONFIGURATION ---
 st.set_page_config(page_title="Retail Insights Dashboard", page_icon="📊", layout="wide")
@@ -34,10 +33,86 @@ def load_data():
     }
     
     df = pd.DataFrame(data)
-    df['Profit'] = df['Sales'] * df['Profit_Margin']
-    df['YearMonth'] = df['Order Date'].dt.to_period('M').astype(str)
+    # Low-cardinality text columns as category: groupby/isin work on int codes
+    for col in ('Category', 'Segment', 'Region'):
+        df[col] = df[col].astype('category')
+    # Downcast numerics to halve bytes moved by groupby/sum/rolling
+    df = df.astype({'Sales': 'float32', 'Profit_Margin': 'float32', 'Returned': 'int8', 'CustomerID': 'int16'})
+    df['Profit'] = (df['Sales'] * df['Profit_Margin']).astype('float32')
     return df
 
+# --- FILTERING (Shared by the sidebar selection and the cached helpers) ---
+def select(df, regions, segments):
+    return df.loc[df['Region'].isin(regions) & df['Segment'].isin(segments)]
+
+# --- MONTHLY TREND (Cached per filter selection) ---
+@st.cache_data
+def monthly_trend(regions, segments):
+    df_sel = select(load_data(), regions, segments)
+    
+    # Group straight on the monthly period, no per-row 'YearMonth' column needed
+    monthly_sales = df_sel.groupby(df_sel['Order Date'].dt.to_period('M'))['Sales'].sum()
+    monthly_sales = monthly_sales.rename_axis('YearMonth').reset_index()
+    monthly_sales['YearMonth'] = monthly_sales['YearMonth'].astype(str) # Period -> label for plotting
+    try: # JIT rolling kernel when numba is installed (optional)
+        monthly_sales['Sales_MA_3'] = monthly_sales['Sales'].rolling(window=3).mean(
+            engine='numba', engine_kwargs={'nogil': True, 'parallel': False})
+    except ImportError:
+        monthly_sales['Sales_MA_3'] = monthly_sales['Sales'].rolling(window=3).mean()
+    return monthly_sales
+
+# --- RFM (Cached per filter selection) ---
+def score4(s, ascending=True):
+    # Quartile score 1-4 from percentile rank (no Categorical round-trip like qcut)
+    r = s.rank(pct=True, ascending=ascending)
+    return np.ceil(r * 4).clip(1, 4).astype('int8')
+
+@st.cache_data
+def compute_rfm(regions, segments):
+    df = load_data()
+    df_sel = select(df, regions, segments)
+    
+    snapshot_date = df['Order Date'].max() + pd.Timedelta(days=1)
+    rfm = df_sel.groupby('CustomerID').agg(
+        last_order=('Order Date', 'max'),
+        Frequency=('Order Date', 'size'),
+        Monetary=('Sales', 'sum')
+    )
+    rfm['Recency'] = (snapshot_date - rfm['last_order']).dt.days
+    rfm = rfm.drop(columns='last_order')
+    
+    # Calculate simple segments
+    rfm['Score'] = score4(rfm['Recency'], ascending=False) + score4(rfm['Frequency']) + score4(rfm['Monetary'])
+    
+    score = rfm['Score'].values
+    rfm['Segment'] = np.select([score >= 10, score >= 7],
+                               ['Gold Tier (Loyal)', 'Silver Tier (Promising)'],
+                               default='Bronze Tier (Needs Attention)')
+    return rfm
+
+# --- CHART BUILDERS (Figures cached as shared resources, keyed on the aggregated frames) ---
+@st.cache_resource
+def build_trend_fig(monthly_sales):
+    fig_trend = go.Figure()
+    fig_trend.add_trace(go.Bar(x=monthly_sales['YearMonth'], y=monthly_sales['Sales'], name='Actual Sales', marker_color='#0083B8'))
+    fig_trend.add_trace(go.Scatter(x=monthly_sales['YearMonth'], y=monthly_sales['Sales_MA_3'], name='3-Month Moving Avg', line=dict(color='orange', width=3)))
+    
+    fig_trend.update_layout(xaxis_title="Month", yaxis_title="Sales ($)", template="plotly_white")
+    return fig_trend
+
+@st.cache_resource
+def build_sunburst_fig(category_group):
+    return px.sunburst(category_group, path=['Category', 'Region'], values='Sales', color='Profit', title="Sales by Category & Region")
+
+@st.cache_resource
+def build_returns_fig(return_data):
+    return px.bar(return_data, x='Category', y='Return_Count', title="Total Returns by Category", color='Category', color_discrete_sequence=px.colors.qualitative.Pastel)
+
+@st.cache_resource
+def build_rfm_fig(rfm):
+    return px.scatter(rfm, x='Recency', y='Monetary', color='Segment', size='Frequency', 
+                      title="RFM Segments: Recency vs Monetary Value", hover_data=['Frequency'])
+
 df = load_data()
 
 # --- 3. SIDEBAR FILTERS ---
@@ -46,21 +121,19 @@ st.sidebar.header("Filter Options")
 # Filter by Region
 region_filter = st.sidebar.multiselect(
     "Select Region:",
-    options=df["Region"].unique(),
-    default=df["Region"].unique()
+    options=df["Region"].cat.categories,
+    default=df["Region"].cat.categories
 )
 
 # Filter by Segment
 segment_filter = st.sidebar.multiselect(
     "Select Segment:",
-    options=df["Segment"].unique(),
-    default=df["Segment"].unique()
+    options=df["Segment"].cat.categories,
+    default=df["Segment"].cat.categories
 )
 
 # Apply Filters
-df_selection = df.query(
-    "Region == @region_filter & Segment == @segment_filter"
-)
+df_selection = select(df, region_filter, segment_filter)
 
 # Check if dataframe is empty
 if df_selection.empty:
@@ -95,14 +168,8 @@ tab1, tab2, tab3 = st.tabs(["📈 Sales Trends", "🌍 Geographic & Category", "
 with tab1:
     st.subheader("Sales Trend & Forecasting")
     # Prepare data
-    monthly_sales = df_selection.groupby('YearMonth')['Sales'].sum().reset_index()
-    monthly_sales['Sales_MA_3'] = monthly_sales['Sales'].rolling(window=3).mean()
-    
-    fig_trend = go.Figure()
-    fig_trend.add_trace(go.Bar(x=monthly_sales['YearMonth'], y=monthly_sales['Sales'], name='Actual Sales', marker_color='#0083B8'))
-    fig_trend.add_trace(go.Scatter(x=monthly_sales['YearMonth'], y=monthly_sales['Sales_MA_3'], name='3-Month Moving Avg', line=dict(color='orange', width=3)))
-    
-    fig_trend.update_layout(xaxis_title="Month", yaxis_title="Sales ($)", template="plotly_white")
+    monthly_sales = monthly_trend(tuple(sorted(region_filter)), tuple(sorted(segment_filter)))
+    fig_trend = build_trend_fig(monthly_sales)
     st.plotly_chart(fig_trend, use_container_width=True)
 
 with tab2:
@@ -111,42 +178,24 @@ with tab2:
     
     with col1:
         # Sunburst
-        category_group = df_selection.groupby(['Category', 'Region'])[['Sales', 'Profit']].sum().reset_index()
-        fig_sun = px.sunburst(category_group, path=['Category', 'Region'], values='Sales', color='Profit', title="Sales by Category & Region")
+        category_group = df_selection.groupby(['Category', 'Region'], observed=True, as_index=False)[['Sales', 'Profit']].sum()
+        fig_sun = build_sunburst_fig(category_group)
         st.plotly_chart(fig_sun, use_container_width=True)
         
     with col2:
         # Bar Chart for Returns
-        return_data = df_selection[df_selection['Returned']==1].groupby('Category')['Sales'].count().reset_index(name='Return_Count')
-        fig_ret = px.bar(return_data, x='Category', y='Return_Count', title="Total Returns by Category", color='Category', color_discrete_sequence=px.colors.qualitative.Pastel)
+        return_data = df_selection.groupby('Category', observed=True)['Returned'].sum().reset_index(name='Return_Count')
+        fig_ret = build_returns_fig(return_data)
         st.plotly_chart(fig_ret, use_container_width=True)
 
 with tab3:
     st.subheader("Customer Segmentation (RFM Analysis)")
     st.markdown("We classify customers based on **Recency** (last purchase), **Frequency** (count), and **Monetary** (total spend).")
     
-    snapshot_date = df['Order Date'].max() + datetime.timedelta(days=1)
-    rfm = df_selection.groupby('CustomerID').agg({
-        'Order Date': lambda x: (snapshot_date - x.max()).days,
-        'CustomerID': 'count',
-        'Sales': 'sum'
-    }).rename(columns={'Order Date': 'Recency', 'CustomerID': 'Frequency', 'Sales': 'Monetary'})
-    
-    # Calculate simple segments
-    rfm['Score'] = pd.qcut(rfm['Recency'], 4, labels=[4, 3, 2, 1]).astype(int) + \
-                   pd.qcut(rfm['Frequency'].rank(method='first'), 4, labels=[1, 2, 3, 4]).astype(int) + \
-                   pd.qcut(rfm['Monetary'], 4, labels=[1, 2, 3, 4]).astype(int)
-    
-    def segment_me(score):
-        if score >= 10: return 'Gold Tier (Loyal)'
-        elif score >= 7: return 'Silver Tier (Promising)'
-        else: return 'Bronze Tier (Needs Attention)'
-        
-    rfm['Segment'] = rfm['Score'].apply(segment_me)
+    rfm = compute_rfm(tuple(sorted(region_filter)), tuple(sorted(segment_filter)))
     
     # Scatter Plot
-    fig_rfm = px.scatter(rfm, x='Recency', y='Monetary', color='Segment', size='Frequency', 
-                         title="RFM Segments: Recency vs Monetary Value", hover_data=['Frequency'])
+    fig_rfm = build_rfm_fig(rfm)
     st.plotly_chart(fig_rfm, use_container_width=True)
 
 # --- 6. FOOTER ---